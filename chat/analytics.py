@@ -0,0 +1,331 @@
+"""
+Room activity analytics.
+
+The ingest path bumps Redis counters per time bucket (record_message);
+rollup_activity() periodically merges closed buckets into RoomActivity rows;
+room_activity() answers reports from those rows plus the still-live
+buckets. Nothing here reads ChatMessage.
+
+Redis layout, per bucket (unix seconds, multiple of BUCKET_SECONDS):
+
+    chat:stats:buckets                    ZSET  bucket -> bucket
+    chat:stats:<bucket>:messages          HASH  room -> message count
+    chat:stats:<bucket>:senders:<room>    HLL   sender ids
+    chat:stats:<bucket>:top:<room>        ZSET  sender id -> message count
+
+rollup_activity() renames a closed bucket's keys to a snapshot
+(`rollup:<bucket>:<id>` in place of `<bucket>`), queued in
+chat:stats:rollup until merged.
+"""
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import redis
+from django.db import transaction
+
+from chat.models import RoomActivity
+from chat.redis import redis_client, redis_raw_client
+
+BUCKET_SECONDS = 60
+# Live buckets that are never rolled up expire on their own
+RETENTION_SECONDS = 2 * 24 * 3600
+TOP_SENDERS_PER_BUCKET = 10
+
+BUCKETS_KEY = "chat:stats:buckets"
+# Snapshots renamed out of BUCKETS_KEY and not yet merged: snapshot -> bucket
+ROLLUP_KEY = "chat:stats:rollup"
+ROLLUP_LOCK_KEY = "chat:stats:rollup:lock"
+ROLLUP_LOCK_SECONDS = 600
+
+
+def _bucket(ts):
+    return int(ts) // BUCKET_SECONDS * BUCKET_SECONDS
+
+
+def _messages_key(bucket):
+    return f"chat:stats:{bucket}:messages"
+
+
+def _senders_key(bucket, room_name):
+    return f"chat:stats:{bucket}:senders:{room_name}"
+
+
+def _top_key(bucket, room_name):
+    return f"chat:stats:{bucket}:top:{room_name}"
+
+
+def _to_datetime(bucket):
+    return datetime.fromtimestamp(bucket, tz=timezone.utc)
+
+
+# ------------------------
+# INGEST
+# ------------------------
+
+def record_message(room_name, sender_id, ts=None):
+    """Count one stored message; a single round trip."""
+    bucket = _bucket(ts or time.time())
+    messages_key = _messages_key(bucket)
+    senders_key = _senders_key(bucket, room_name)
+    top_key = _top_key(bucket, room_name)
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hincrby(messages_key, room_name, 1)
+    pipe.pfadd(senders_key, sender_id)
+    pipe.zincrby(top_key, 1, sender_id)
+    pipe.zadd(BUCKETS_KEY, {bucket: bucket})
+    for key in (messages_key, senders_key, top_key):
+        pipe.expire(key, RETENTION_SECONDS)
+    pipe.execute()
+
+
+# ------------------------
+# ROLLUP
+# ------------------------
+
+def _stage_bucket(bucket):
+    """
+    Atomically rename a bucket's keys to a snapshot and queue it for the
+    rollup; returns the snapshot id (used in place of a bucket in the key
+    helpers), or None for an empty bucket. A write landing after this
+    recreates the bucket as a delta.
+    """
+    snapshot = f"rollup:{bucket}:{uuid.uuid4().hex}"
+    messages_key = _messages_key(bucket)
+
+    with redis_client.pipeline() as pipe:
+        while True:
+            try:
+                # A room added between HKEYS and EXEC aborts and retries
+                pipe.watch(messages_key)
+                rooms = pipe.hkeys(messages_key)
+                pipe.multi()
+                pipe.zrem(BUCKETS_KEY, bucket)
+                if rooms:
+                    pipe.rename(messages_key, _messages_key(snapshot))
+                    for room_name in rooms:
+                        pipe.rename(_senders_key(bucket, room_name), _senders_key(snapshot, room_name))
+                        pipe.rename(_top_key(bucket, room_name), _top_key(snapshot, room_name))
+                    pipe.zadd(ROLLUP_KEY, {snapshot: bucket})
+                # A key whose first write is still in flight fails its RENAME
+                # alone; that write lands in the live bucket
+                pipe.execute(raise_on_error=False)
+                return snapshot if rooms else None
+            except redis.WatchError:
+                continue
+
+
+def _read_bucket(bucket):
+    """{room: (message_count, hll bytes, top senders)}"""
+    counts = redis_client.hgetall(_messages_key(bucket))
+    rooms = list(counts)
+
+    pipe = redis_raw_client.pipeline(transaction=False)
+    for room_name in rooms:
+        pipe.get(_senders_key(bucket, room_name))
+        pipe.zrevrange(
+            _top_key(bucket, room_name), 0, TOP_SENDERS_PER_BUCKET - 1, withscores=True
+        )
+    results = pipe.execute()
+
+    data = {}
+    for i, room_name in enumerate(rooms):
+        hll, top = results[i * 2:i * 2 + 2]
+        data[room_name] = (
+            int(counts[room_name]),
+            hll,
+            [[int(sender), int(score)] for sender, score in top],
+        )
+    return data
+
+
+def _merge_hlls(*blobs):
+    """(PFCOUNT, merged HLL bytes) of raw HyperLogLog blobs."""
+    blobs = [bytes(blob) for blob in blobs if blob]
+    if not blobs:
+        return 0, None
+
+    keys = [f"chat:stats:tmp:{uuid.uuid4().hex}" for _ in blobs]
+
+    pipe = redis_raw_client.pipeline()
+    for key, blob in zip(keys, blobs):
+        pipe.set(key, blob, ex=60)
+    pipe.pfmerge(keys[0], *keys[1:])
+    pipe.pfcount(keys[0])
+    pipe.get(keys[0])
+    pipe.delete(*keys)
+    unique, merged = pipe.execute()[-3:-1]
+    return unique, merged
+
+
+def _merge_top(*lists):
+    total = Counter()
+    for top in lists:
+        for sender_id, count in top:
+            total[sender_id] += count
+    return [list(item) for item in total.most_common(TOP_SENDERS_PER_BUCKET)]
+
+
+def _merge_snapshot(snapshot, bucket):
+    """Add a staged snapshot onto its RoomActivity rows, then drop its keys."""
+    data = _read_bucket(snapshot)
+    bucket_start = _to_datetime(bucket)
+
+    with transaction.atomic():
+        existing = {
+            row.room_name: row
+            for row in RoomActivity.objects.select_for_update().filter(
+                bucket_start=bucket_start, room_name__in=list(data)
+            )
+        }
+
+        rows = []
+        for room_name, (count, hll, top) in data.items():
+            row = existing.get(room_name)
+            if row is not None:
+                count += row.message_count
+                top = _merge_top(row.top_senders, top)
+            unique, hll = _merge_hlls(hll, row.sender_hll if row else None)
+            rows.append(RoomActivity(
+                room_name=room_name,
+                bucket_start=bucket_start,
+                message_count=count,
+                unique_senders=unique,
+                sender_hll=hll,
+                top_senders=top,
+            ))
+
+        RoomActivity.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["room_name", "bucket_start"],
+            update_fields=["message_count", "unique_senders", "sender_hll", "top_senders"],
+        )
+
+    keys = [_messages_key(snapshot)]
+    for room_name in data:
+        keys += [_senders_key(snapshot, room_name), _top_key(snapshot, room_name)]
+    pipe = redis_client.pipeline()
+    pipe.delete(*keys)
+    pipe.zrem(ROLLUP_KEY, snapshot)
+    pipe.execute()
+
+
+def rollup_activity(now=None):
+    """
+    Fold buckets older than one full bucket into RoomActivity.
+
+    The extra bucket of grace lets in-flight writes and slightly slow worker
+    clocks land first. Each bucket is renamed to a snapshot before it is
+    read and its counts are added onto the existing row, so a later write
+    to a rolled-up bucket is merged in by the next run rather than
+    replacing the row. Snapshots left by an interrupted run are merged on
+    the next one; a crash between the DB commit and the key cleanup counts
+    that snapshot twice. Runs are serialized through ROLLUP_LOCK_KEY.
+
+    Returns the number of snapshots merged, or 0 if another rollup is running.
+    """
+    token = uuid.uuid4().hex
+    if not redis_client.set(ROLLUP_LOCK_KEY, token, nx=True, ex=ROLLUP_LOCK_SECONDS):
+        return 0
+
+    try:
+        cutoff = _bucket(now or time.time()) - BUCKET_SECONDS
+        for bucket in redis_client.zrangebyscore(BUCKETS_KEY, "-inf", f"({cutoff}"):
+            _stage_bucket(int(bucket))
+
+        snapshots = redis_client.zrange(ROLLUP_KEY, 0, -1, withscores=True)
+        for snapshot, bucket in snapshots:
+            _merge_snapshot(snapshot, int(bucket))
+        return len(snapshots)
+    finally:
+        if redis_client.get(ROLLUP_LOCK_KEY) == token:
+            redis_client.delete(ROLLUP_LOCK_KEY)
+
+
+# ------------------------
+# QUERIES
+# ------------------------
+
+def _count_unique(live_keys, stored_hlls):
+    """PFCOUNT over live HLL keys and rolled-up HLL blobs together."""
+    stored_hlls = [blob for blob in stored_hlls if blob]
+    if not live_keys and not stored_hlls:
+        return 0
+
+    temp_keys = [f"chat:stats:tmp:{uuid.uuid4().hex}" for _ in stored_hlls]
+
+    pipe = redis_raw_client.pipeline()
+    for key, blob in zip(temp_keys, stored_hlls):
+        pipe.set(key, bytes(blob), ex=60)
+    pipe.pfcount(*live_keys, *temp_keys)
+    if temp_keys:
+        pipe.delete(*temp_keys)
+    return pipe.execute()[len(temp_keys)]
+
+
+def room_activity(minutes=60, room_name=None, top=5, now=None):
+    """
+    Activity per room over the last `minutes`, busiest room first:
+
+        {"room_name", "messages", "unique_senders",
+         "messages_per_minute": [[iso bucket, count], ...],
+         "top_senders": [[sender_id, count], ...]}
+
+    Top senders are summed from each bucket's top list, so they are exact
+    for rooms with at most TOP_SENDERS_PER_BUCKET senders per bucket.
+    """
+    now = now or time.time()
+    since = _bucket(now - minutes * 60)
+
+    series = defaultdict(Counter)
+    senders = defaultdict(Counter)
+    stored_hlls = defaultdict(list)
+    live_keys = defaultdict(list)
+
+    rows = RoomActivity.objects.filter(bucket_start__gte=_to_datetime(since))
+    if room_name:
+        rows = rows.filter(room_name=room_name)
+
+    for row in rows.iterator():
+        series[row.room_name][int(row.bucket_start.timestamp())] += row.message_count
+        stored_hlls[row.room_name].append(row.sender_hll)
+        for sender_id, count in row.top_senders:
+            senders[row.room_name][sender_id] += count
+
+    for bucket in redis_client.zrangebyscore(BUCKETS_KEY, since, "+inf"):
+        bucket = int(bucket)
+        counts = redis_client.hgetall(_messages_key(bucket))
+        for room, count in counts.items():
+            if room_name and room != room_name:
+                continue
+            # Add: a live bucket that was already rolled up holds only the
+            # late writes on top of its row
+            series[room][bucket] += int(count)
+            live_keys[room].append(_senders_key(bucket, room))
+            for sender_id, score in redis_client.zrevrange(
+                _top_key(bucket, room), 0, TOP_SENDERS_PER_BUCKET - 1, withscores=True
+            ):
+                senders[room][int(sender_id)] += int(score)
+
+    report = [
+        {
+            "room_name": room,
+            "messages": sum(buckets.values()),
+            "unique_senders": _count_unique(live_keys[room], stored_hlls[room]),
+            "messages_per_minute": [
+                [_to_datetime(b).isoformat(), c] for b, c in sorted(buckets.items())
+            ],
+            "top_senders": [list(item) for item in senders[room].most_common(top)],
+        }
+        for room, buckets in series.items()
+    ]
+    report.sort(key=lambda r: r["messages"], reverse=True)
+    return report
+
+
+def active_rooms(minutes=15):
+    """Rooms with at least one message in the last `minutes`."""
+    return [r["room_name"] for r in room_activity(minutes=minutes, top=0)]
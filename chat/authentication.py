@@ -0,0 +1,44 @@
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+from rest_framework_simplejwt.tokens import UntypedToken
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from shared.models import User
+
+
+class JWTAuthentication(BaseAuthentication):
+    """
+    HTTP counterpart of JWTAuthMiddleware: accepts `Authorization: Bearer <token>`
+    issued by the main service and resolves it to a shared User.
+    """
+
+    keyword = "Bearer"
+
+    def authenticate(self, request):
+        header = get_authorization_header(request).split()
+
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(header) != 2:
+            raise AuthenticationFailed("Invalid token header.")
+
+        try:
+            validated_token = UntypedToken(header[1].decode())
+        except (InvalidToken, TokenError, UnicodeError) as e:
+            raise AuthenticationFailed(str(e))
+
+        user_id = validated_token.payload.get("user_id")
+        if user_id is None:
+            raise AuthenticationFailed("Token has no user_id.")
+
+        try:
+            user = User.objects.get(id=int(user_id))
+        except User.DoesNotExist:
+            raise AuthenticationFailed("User not found.")
+
+        return user, validated_token
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,141 @@
+"""
+Frame encoding for ChatConsumer.
+
+Clients opt in by offering a WebSocket subprotocol:
+
+    chat.v2          compact `chat_history` frames, everything else unchanged
+    chat.v2.deflate  as above, and any frame larger than
+                     CHAT_COMPRESSION_THRESHOLD bytes is sent as a *binary*
+                     frame holding the zlib-compressed JSON text
+
+Text frames are always plain JSON, so a client only has to inflate binary
+frames. Clients that offer nothing keep the original format.
+"""
+import json
+import time
+import zlib
+
+from django.conf import settings
+
+
+SUBPROTOCOLS = {
+    # name: (compact history, deflate large frames)
+    "chat.v2": (True, False),
+    "chat.v2.deflate": (True, True),
+}
+
+COMPACT_HISTORY_FIELDS = [
+    "id",
+    "sender",
+    "message",
+    "message_type",
+    "build_ids",
+    "is_delivered",
+    "is_seen",
+    "timestamp",
+]
+
+
+def negotiate(offered):
+    """
+    Pick the first supported subprotocol in the client's preference order.
+
+    Returns (subprotocol, compact, deflate); subprotocol is None for legacy
+    clients.
+    """
+    for name in offered or []:
+        if name in SUBPROTOCOLS:
+            return (name, *SUBPROTOCOLS[name])
+    return None, False, False
+
+
+def compact_history(room_name, messages):
+    """
+    `chat_history` frame with repeated values factored out: room_name is
+    sent once and senders go into a header table referenced by index.
+    """
+    senders = []
+    sender_index = {}
+    rows = []
+
+    for m in messages:
+        key = (m.get("sender_id"), m.get("sender_name"))
+        if key not in sender_index:
+            sender_index[key] = len(senders)
+            senders.append(list(key))
+
+        rows.append([
+            m["id"],
+            sender_index[key],
+            m.get("message"),
+            m.get("message_type", "text"),
+            m.get("build_ids"),
+            m.get("is_delivered"),
+            m.get("is_seen"),
+            m.get("timestamp"),
+        ])
+
+    return {
+        "type": "chat_history",
+        "format": "compact",
+        "room_name": room_name,
+        "fields": COMPACT_HISTORY_FIELDS,
+        "senders": senders,
+        "rows": rows,
+    }
+
+
+class FrameStats:
+    """Process-wide counters for bytes on the wire and compression CPU."""
+
+    def __init__(self):
+        self.frames = 0
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+        self.compressed_frames = 0
+        self.compress_seconds = 0.0
+
+    def as_dict(self):
+        return {
+            "frames": self.frames,
+            "raw_bytes": self.raw_bytes,
+            "sent_bytes": self.sent_bytes,
+            "compressed_frames": self.compressed_frames,
+            "compress_seconds": round(self.compress_seconds, 6),
+        }
+
+
+frame_stats = FrameStats()
+
+
+def deflate(raw):
+    """zlib-compress `raw`; returns (compressed, cpu seconds)."""
+    started = time.perf_counter()
+    compressed = zlib.compress(raw, settings.CHAT_COMPRESSION_LEVEL)
+    return compressed, time.perf_counter() - started
+
+
+def encode_frame(event, allow_deflate=False):
+    """
+    Serialize `event` for `send()`.
+
+    Returns ("text", str) or, when deflate was negotiated and the frame is
+    over the threshold, ("bytes", bytes).
+    """
+    text = json.dumps(event, separators=(",", ":"))
+    raw = text.encode()
+
+    frame_stats.frames += 1
+    frame_stats.raw_bytes += len(raw)
+
+    if allow_deflate and len(raw) >= settings.CHAT_COMPRESSION_THRESHOLD:
+        compressed, seconds = deflate(raw)
+        frame_stats.compress_seconds += seconds
+
+        if len(compressed) < len(raw):
+            frame_stats.compressed_frames += 1
+            frame_stats.sent_bytes += len(compressed)
+            return "bytes", compressed
+
+    frame_stats.sent_bytes += len(raw)
+    return "text", text
@@ -1,15 +1,31 @@
 import json
+import time
+
+import redis
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
-from chat.models import ChatMessage, ChatRoom
+from django.db.models.functions import Now
+from chat.models import ChatMessage
 from shared.models import User
-from chat.redis import add_message_to_redis, get_messages_from_redis
+from chat.analytics import record_message
+from chat.executors import db_executor
+from chat.compression import compact_history, encode_frame, negotiate
+from chat.history import get_room_history, is_room_participant, merge_cached_messages
+from chat.ingest import ERROR, INVALID, STORED, ingest_messages, normalize_message_id
+from chat.recorder import get_recorder
+from chat.redis import add_message_to_redis
+from chat.search import search_messages
+from chat.warmup import state as warmup_state
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
 
+    # Frame options, negotiated through the WebSocket subprotocol on connect
+    compact_frames = False
+    deflate_frames = False
+
     async def connect(self):
+        connect_started = time.perf_counter()
         user = self.scope.get("user")
 
         if isinstance(user, AnonymousUser):
@@ -32,27 +48,30 @@ class ChatConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
 
-        await self.accept()
-
-        db_messages = await self.get_chat_history()
-        redis_messages = get_messages_from_redis(self.room_name)
+        subprotocol, self.compact_frames, self.deflate_frames = negotiate(
+            self.scope.get("subprotocols")
+        )
 
-        db_ids = {m["id"] for m in db_messages}
-        merged = db_messages + [m for m in redis_messages if m["id"] not in db_ids]
+        await self.accept(subprotocol=subprotocol)
 
-        for m in merged:
-            m.setdefault("message_type", "text")
-            m.setdefault("build_ids", None)
+        recorder = get_recorder()
+        if recorder:
+            recorder.connect(self)
 
-        messages = merged
+        db_messages = await self.get_chat_history()
+        messages = merge_cached_messages(self.room_name, db_messages)
 
         if not messages:
             messages = await self.get_chat_history()
 
-        await self.send(text_data=json.dumps({
-            "type": "chat_history",
-            "payload": messages
-        }))
+        if self.compact_frames:
+            await self.send_event(compact_history(self.room_name, messages))
+        else:
+            await self.send_event({
+                "type": "chat_history",
+                "payload": messages
+            })
+        warmup_state.record_first_message(time.perf_counter() - connect_started)
         # 🔥 mark all messages from other user as seen
         await self.mark_room_messages_seen()
 
@@ -72,6 +91,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
 
     async def disconnect(self, close_code):
+        recorder = get_recorder()
+        if recorder:
+            recorder.disconnect(self, close_code)
+
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
@@ -81,6 +104,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
         data = json.loads(text_data)
         event_type = data.get("type")
 
+        recorder = get_recorder()
+        if recorder:
+            recorder.receive(self, data)
+
         if event_type == "chat_message":
             await self.handle_chat_message(data)
 
@@ -96,6 +123,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
         elif event_type == "build_bundle":
             await self.handle_build_bundle(data)
 
+        elif event_type == "search":
+            await self.handle_search(data)
+
     # ------------------------
     # HANDLERS
     # ------------------------
@@ -103,17 +133,19 @@ class ChatConsumer(AsyncWebsocketConsumer):
     async def handle_chat_message(self, data):
         payload = data.get("payload", {})
 
-        message_id = payload.get("id")
+        client_id = payload.get("id")
+        message_id = normalize_message_id(client_id)
         message = payload.get("message")
 
         if not all([message_id, message]):
             print("❌ Invalid chat payload:", payload)
+            await self.send_ack(client_id, INVALID)
             return
 
         sender = await self.get_user(self.user_id)
 
         message_data = {
-            "id": str(message_id),
+            "id": message_id,
             "room_name": self.room_name,
             "sender_id": sender.id,
             "sender_name": sender.email,
@@ -124,11 +156,21 @@ class ChatConsumer(AsyncWebsocketConsumer):
             "is_seen": False,
         }
 
-        # ✅ Save to DB
-        await self.save_message(message_id, sender, message)
+        # ✅ Save to DB (a retried id is acked but never re-broadcast)
+        try:
+            status = await self.save_message(message_id, sender, message)
+        except Exception as e:
+            print("❌ Save failed:", e)
+            await self.send_ack(client_id, ERROR)
+            return
+
+        await self.send_ack(client_id, status)
+        if status != STORED:
+            return
 
         # ✅ Save to Redis
-        add_message_to_redis(self.room_name, message_data)
+        self.cache_message(message_data)
+        self.record_activity(sender.id)
 
         # ✅ Broadcast
         await self.channel_layer.group_send(
@@ -143,18 +185,20 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
     async def handle_build_bundle(self, data):
         payload = data.get("payload", {})
-        message_id = payload.get("id")
+        client_id = payload.get("id")
+        message_id = normalize_message_id(client_id)
         text = payload.get("message", "")
         build_ids = payload.get("build_ids", [])
 
         if not message_id or not build_ids:
             print("❌ Invalid build_bundle payload:", payload)
+            await self.send_ack(client_id, INVALID)
             return
 
         sender = await self.get_user(self.user_id)
 
         message_data = {
-            "id": str(message_id),
+            "id": message_id,
             "room_name": self.room_name,
             "sender_id": sender.id,
             "sender_name": sender.email,
@@ -165,11 +209,21 @@ class ChatConsumer(AsyncWebsocketConsumer):
             "is_seen": False,
         }
         print("📦 BUILD HANDLER HIT:", message_data)
-        # ✅ Save to DB
-        await self.save_build_bundle(message_id, sender, text, build_ids)
+        # ✅ Save to DB (a retried id is acked but never re-broadcast)
+        try:
+            status = await self.save_build_bundle(message_id, sender, text, build_ids)
+        except Exception as e:
+            print("❌ Save failed:", e)
+            await self.send_ack(client_id, ERROR)
+            return
+
+        await self.send_ack(client_id, status)
+        if status != STORED:
+            return
 
         # ✅ Save to Redis
-        add_message_to_redis(self.room_name, message_data)
+        self.cache_message(message_data)
+        self.record_activity(sender.id)
 
         # ✅ Broadcast
         await self.channel_layer.group_send(
@@ -226,33 +280,78 @@ class ChatConsumer(AsyncWebsocketConsumer):
             }
         )
 
+    async def handle_search(self, data):
+        payload = data.get("payload", {})
+
+        try:
+            result = await self.run_search(
+                payload.get("query", ""),
+                payload.get("cursor"),
+                payload.get("limit"),
+                payload.get("room_name"),
+            )
+        except ValueError as e:
+            result = {"results": [], "next_cursor": None, "error": str(e)}
+
+        # Reply to the requesting socket only, never through the room group
+        await self.send_event({
+            "type": "search_results",
+            "payload": {"query": payload.get("query", ""), **result}
+        })
+
+    def cache_message(self, message_data):
+        add_message_to_redis(self.room_name, message_data)
+
+    def record_activity(self, sender_id):
+        # Analytics must never fail a send
+        try:
+            record_message(self.room_name, sender_id)
+        except redis.RedisError as e:
+            print("❌ Analytics error:", e)
+
     # ------------------------
     # BROADCAST
     # ------------------------
 
     async def broadcast_message(self, event):
-        await self.send(text_data=json.dumps(event["event"]))
+        await self.send_event(event["event"])
+
+    async def send_ack(self, message_id, status):
+        # Sent to the sender only; clients keep retrying on "error" and "pending"
+        await self.send_event({
+            "type": "message_ack",
+            "payload": {"id": message_id, "status": status}
+        })
+
+    async def send_event(self, event):
+        kind, frame = encode_frame(event, self.deflate_frames)
+
+        if kind == "bytes":
+            await self.send(bytes_data=frame)
+        else:
+            await self.send(text_data=frame)
 
     # ------------------------
     # DB HELPERS
     # ------------------------
 
-    @database_sync_to_async
+    @db_executor("auth")
     def get_user(self, user_id):
         return User.objects.get(id=user_id)
 
-    @database_sync_to_async
+    @db_executor("write")
     def save_message(self, message_id, sender, message):
-        ChatMessage.objects.create(
+        return ingest_messages(self.room_name, [ChatMessage(
             id=message_id,
             room_name=self.room_name,
             sender=sender,
             message=message,
             is_delivered=True,
-        )
-    @database_sync_to_async
+        )])[message_id]
+
+    @db_executor("write")
     def save_build_bundle(self, message_id, sender, text, build_ids):
-        ChatMessage.objects.create(
+        return ingest_messages(self.room_name, [ChatMessage(
             id=message_id,
             room_name=self.room_name,
             sender=sender,
@@ -260,56 +359,44 @@ class ChatConsumer(AsyncWebsocketConsumer):
             message_type="build_bundle",
             build_ids=build_ids,
             is_delivered=True,
-        )
+        )])[message_id]
 
-    @database_sync_to_async
+    @db_executor("write")
     def mark_delivered(self, message_id):
         if message_id:
-            ChatMessage.objects.filter(id=message_id).update(is_delivered=True)
+            ChatMessage.objects.filter(id=message_id, is_delivered=False).update(
+                is_delivered=True, updated_at=Now()
+            )
 
-    @database_sync_to_async
+    @db_executor("write")
     def mark_seen(self, message_id):
         if message_id:
-            ChatMessage.objects.filter(id=message_id).update(is_seen=True)
+            ChatMessage.objects.filter(id=message_id, is_seen=False).update(
+                is_seen=True, updated_at=Now()
+            )
 
-    @database_sync_to_async
+    @db_executor("read")
     def get_chat_history(self):
-        qs = (
-            ChatMessage.objects
-            .filter(room_name=self.room_name)
-            .order_by("-timestamp")[:50]
-        )
-
-        qs = list(reversed(qs))
+        return get_room_history(self.room_name)
 
-        return [
-            {
-                "id": str(m.id),
-                "sender_id": m.sender_id,
-                "sender_name": m.sender.email, 
-                "message": m.message,
-                "message_type": m.message_type,        # ✅ add
-                "build_ids": m.build_ids,
-                "is_delivered": m.is_delivered,
-                "is_seen": m.is_seen,
-                "timestamp": m.timestamp.isoformat(),
-            }
-            for m in qs
-        ]
+    @db_executor("bulk")
+    def run_search(self, query, cursor, limit, room_name):
+        return search_messages(
+            self.user_id, query, cursor=cursor, limit=limit, room_name=room_name
+        )
 
     # ------------------------
     # PARTICIPANT CHECK 🔒
     # ------------------------
 
-    @database_sync_to_async
+    @db_executor("auth")
     def is_participant(self, user_id):
-        return ChatRoom.objects.filter(
-            room_name=self.room_name,
-            participants__id=user_id
-        ).exists()
+        return is_room_participant(self.room_name, user_id)
     
-    @database_sync_to_async
+    @db_executor("bulk")
     def mark_room_messages_seen(self):
+        # Only unseen rows, so a reconnect does not bump updated_at (and the
+        # room's ETag) when nothing changed
         ChatMessage.objects.filter(
-            room_name=self.room_name
-        ).exclude(sender_id=self.user_id).update(is_seen=True)
+            room_name=self.room_name, is_seen=False
+        ).exclude(sender_id=self.user_id).update(is_seen=True, updated_at=Now())
@@ -0,0 +1,147 @@
+"""
+Named, bounded thread pools for ORM calls made from async code.
+
+    @db_executor("write")
+    def save_message(self, ...):
+        ...
+
+works like @database_sync_to_async, but the call runs on the named pool
+from settings.CHAT_DB_EXECUTORS instead of asgiref's shared executor, so a
+slow query class queues behind itself rather than in front of message
+delivery. Every pool thread keeps its own persistent DB connection, which
+makes the pool sizes the per-worker Postgres connection budget.
+"""
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from channels.db import DatabaseSyncToAsync
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Counters for one pool; wait is submit -> start on a pool thread."""
+
+    def __init__(self, size):
+        self.size = size
+        self.submitted = 0
+        self.completed = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+        self._lock = threading.Lock()
+
+    def record_start(self, wait):
+        with self._lock:
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+    def record_finish(self, run):
+        with self._lock:
+            self.completed += 1
+            self.run_seconds_total += run
+
+    def as_dict(self):
+        started = self.completed or 1
+        return {
+            "size": self.size,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "in_flight": self.submitted - self.completed,
+            "avg_wait_ms": round(self.wait_seconds_total / started * 1000, 3),
+            "max_wait_ms": round(self.wait_seconds_max * 1000, 3),
+            "avg_run_ms": round(self.run_seconds_total / started * 1000, 3),
+        }
+
+
+_executors = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+def _pool_size(name):
+    try:
+        return settings.CHAT_DB_EXECUTORS[name]
+    except KeyError:
+        raise ImproperlyConfigured(f"Unknown DB executor pool: {name!r}")
+
+
+def _open_thread_connection():
+    """Pool thread initializer: connect before the thread's first task."""
+    try:
+        connection.ensure_connection()
+    except Exception as e:
+        # An initializer that raises breaks the whole pool; the thread's
+        # first real call will connect (and fail) on its own instead
+        logger.warning("DB pool thread could not connect: %r", e)
+
+
+def get_executor(name):
+    with _lock:
+        if name not in _executors:
+            size = _pool_size(name)
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=size,
+                thread_name_prefix=f"db-{name}",
+                initializer=_open_thread_connection,
+            )
+            _stats[name] = PoolStats(size)
+        return _executors[name], _stats[name]
+
+
+def db_executor(name):
+    """database_sync_to_async, bound to the named pool."""
+    _pool_size(name)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            executor, stats = get_executor(name)
+            submitted = time.perf_counter()
+            stats.submitted += 1
+
+            def run():
+                started = time.perf_counter()
+                stats.record_start(started - submitted)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    stats.record_finish(time.perf_counter() - started)
+
+            return await DatabaseSyncToAsync(
+                run, thread_sensitive=False, executor=executor
+            )()
+
+        return wrapper
+
+    return decorator
+
+
+async def prewarm(func):
+    """
+    Submit `func` `size` times to every pool, e.g. to validate the DB.
+
+    A full batch submitted at once makes an idle pool start up to `size`
+    threads, each opening its connection in the initializer; threads started
+    later do the same. Nothing blocks, so a pool already busy with consumer
+    calls simply queues these behind them.
+    """
+    loop = asyncio.get_running_loop()
+
+    for name, size in settings.CHAT_DB_EXECUTORS.items():
+        executor, _ = get_executor(name)
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, func) for _ in range(size)
+        ))
+
+
+def executor_stats():
+    with _lock:
+        return {name: stats.as_dict() for name, stats in _stats.items()}
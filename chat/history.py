@@ -0,0 +1,219 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from django.db.models import Count, Max
+
+from chat.models import ChatMessage, ChatRoom
+from chat.redis import get_messages_from_redis
+
+HISTORY_LIMIT = 50
+
+# Positive membership answers are cached per process; a removed participant
+# keeps access for at most MEMBERSHIP_TTL seconds.
+MEMBERSHIP_TTL = 60
+MEMBERSHIP_CACHE_SIZE = 10000
+
+HISTORY_FIELDS = (
+    "id",
+    "sender_id",
+    "sender__email",
+    "message",
+    "message_type",
+    "build_ids",
+    "is_delivered",
+    "is_seen",
+    "timestamp",
+)
+
+
+def _row_to_message(row):
+    (message_id, sender_id, sender_email, message, message_type,
+     build_ids, is_delivered, is_seen, timestamp) = row
+    return {
+        "id": str(message_id),
+        "sender_id": sender_id,
+        "sender_name": sender_email,
+        "message": message,
+        "message_type": message_type,
+        "build_ids": build_ids,
+        "is_delivered": is_delivered,
+        "is_seen": is_seen,
+        "timestamp": timestamp.isoformat(),
+    }
+
+
+def get_room_history(room_name, limit=HISTORY_LIMIT, before=None):
+    """
+    Latest `limit` messages of a room, oldest first.
+
+    Reads plain tuples (sender email joined in the same query) instead of
+    model instances; `before` pages further back by timestamp.
+    """
+    qs = ChatMessage.objects.filter(room_name=room_name)
+    if before is not None:
+        qs = qs.filter(timestamp__lt=before)
+
+    rows = qs.order_by("-timestamp").values_list(*HISTORY_FIELDS)[:limit]
+    return [_row_to_message(row) for row in reversed(rows)]
+
+
+def merge_cached_messages(room_name, db_messages):
+    """Append Redis-cached messages that have not reached the DB page yet."""
+    redis_messages = get_messages_from_redis(room_name)
+
+    db_ids = {m["id"] for m in db_messages}
+    merged = db_messages + [m for m in redis_messages if m["id"] not in db_ids]
+
+    for m in merged:
+        m.setdefault("message_type", "text")
+        m.setdefault("build_ids", None)
+
+    return merged
+
+
+_membership_cache = OrderedDict()
+_membership_lock = threading.Lock()
+
+
+def _remember_membership(room_name, user_id):
+    with _membership_lock:
+        _membership_cache[(room_name, user_id)] = time.monotonic() + MEMBERSHIP_TTL
+        _membership_cache.move_to_end((room_name, user_id))
+        while len(_membership_cache) > MEMBERSHIP_CACHE_SIZE:
+            _membership_cache.popitem(last=False)
+
+
+def is_room_participant(room_name, user_id):
+    expires = _membership_cache.get((room_name, user_id))
+    if expires is not None and expires > time.monotonic():
+        return True
+
+    allowed = ChatRoom.objects.filter(
+        room_name=room_name,
+        participants__id=user_id
+    ).exists()
+
+    if allowed:
+        _remember_membership(room_name, user_id)
+    return allowed
+
+
+def prime_room_membership(room_name):
+    """Load every participant of a room into the membership cache."""
+    user_ids = (
+        ChatRoom.objects
+        .filter(room_name=room_name, participants__isnull=False)
+        .values_list("participants__id", flat=True)
+    )
+    count = 0
+    for user_id in user_ids:
+        _remember_membership(room_name, user_id)
+        count += 1
+    return count
+
+
+# ------------------------
+# CONDITIONAL VALIDATORS
+# ------------------------
+
+def _make_etag(*parts):
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def get_room_validators(room_name, before=None):
+    """
+    (etag, last_modified) for a room, derived from its last-updated message.
+
+    One row read through the (room_name, -updated_at) index. Receipt updates
+    bump updated_at on every message they touch, so marking any message
+    seen or delivered changes the tag, not just a new message. `before` is
+    part of the tag so each history page validates separately.
+    """
+    latest = (
+        ChatMessage.objects
+        .filter(room_name=room_name)
+        .order_by("-updated_at")
+        .values_list("id", "updated_at")
+        .first()
+    )
+
+    page = before.isoformat() if before is not None else "latest"
+    if latest is None:
+        return _make_etag(room_name, page, "empty"), None
+
+    message_id, updated_at = latest
+    return _make_etag(room_name, page, message_id, updated_at.isoformat()), updated_at
+
+
+# ------------------------
+# ROOM SUMMARIES
+# ------------------------
+
+def get_latest_messages(user_id):
+    """Latest message of every room the user participates in, keyed by room."""
+    room_names = (
+        ChatRoom.objects
+        .filter(participants__id=user_id)
+        .values("room_name")
+    )
+
+    rows = (
+        ChatMessage.objects
+        .filter(room_name__in=room_names)
+        .order_by("room_name", "-timestamp")
+        .distinct("room_name")
+        .values_list("room_name", *HISTORY_FIELDS)
+    )
+
+    return {row[0]: _row_to_message(row[1:]) for row in rows}
+
+
+def get_summaries_validators(user_id, latest_messages):
+    """
+    Tag from each room's latest updated_at: a new message or a receipt
+    update (and with it unread_count) anywhere in a room changes it.
+    """
+    if not latest_messages:
+        return _make_etag("summaries", user_id, "empty"), None
+
+    updated = sorted(
+        ChatMessage.objects
+        .filter(room_name__in=list(latest_messages))
+        .values("room_name")
+        .annotate(updated_at=Max("updated_at"))
+        .values_list("room_name", "updated_at")
+    )
+    parts = [
+        (room, latest_messages[room]["id"], updated_at.isoformat())
+        for room, updated_at in updated
+    ]
+    last_modified = max(updated_at for _, updated_at in updated)
+    return _make_etag("summaries", user_id, *parts), last_modified
+
+
+def get_room_summaries(user_id, latest_messages):
+    unread = dict(
+        ChatMessage.objects
+        .filter(room_name__in=list(latest_messages), is_seen=False)
+        .exclude(sender_id=user_id)
+        .values("room_name")
+        .annotate(count=Count("id"))
+        .values_list("room_name", "count")
+    )
+
+    return [
+        {
+            "room_name": room,
+            "last_message": message,
+            "unread_count": unread.get(room, 0),
+        }
+        for room, message in sorted(
+            latest_messages.items(),
+            key=lambda item: item[1]["timestamp"],
+            reverse=True,
+        )
+    ]
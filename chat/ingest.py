@@ -0,0 +1,150 @@
+"""
+Idempotent message ingestion.
+
+Clients retry sends with the same message id after a reconnect. Each id is
+claimed once per room in a short-lived Redis sorted set, and the insert
+itself is INSERT ... ON CONFLICT DO NOTHING, so a retry that outlives the
+Redis window still cannot create a second row or raise.
+"""
+import logging
+import time
+import uuid
+
+import redis
+from django.db import connection
+
+from chat.models import ChatMessage
+from chat.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Seconds a message id is remembered per room
+DEDUP_TTL = 600
+
+# message_ack statuses
+STORED = "stored"
+DUPLICATE = "duplicate"
+# Another send of this id holds the claim but its row is not stored yet;
+# the client must keep retrying
+PENDING = "pending"
+INVALID = "invalid"
+ERROR = "error"
+
+
+def normalize_message_id(value):
+    """Canonical string form of a client message id, or None if not a UUID."""
+    try:
+        return str(uuid.UUID(str(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_seen_key(room_name):
+    return f"chat:room:{room_name}:seen"
+
+
+def claim_message_ids(room_name, message_ids):
+    """
+    Record ids as seen for the room and return the ones that were new.
+
+    Runs as one MULTI/EXEC, so concurrent workers cannot both claim an id.
+    """
+    key = get_seen_key(room_name)
+    now = time.time()
+
+    pipe = redis_client.pipeline()
+    pipe.zremrangebyscore(key, "-inf", now - DEDUP_TTL)
+    for message_id in message_ids:
+        pipe.zadd(key, {message_id: now}, nx=True)
+    pipe.expire(key, DEDUP_TTL)
+    added = pipe.execute()[1:1 + len(message_ids)]
+
+    return [mid for mid, was_added in zip(message_ids, added) if was_added]
+
+
+def release_message_ids(room_name, message_ids):
+    """Forget ids whose insert failed so the client's retry is accepted."""
+    if message_ids:
+        redis_client.zrem(get_seen_key(room_name), *message_ids)
+
+
+def _insert_fields():
+    # search_vector is filled by its trigger (migration 0003)
+    return [f for f in ChatMessage._meta.concrete_fields if f.name != "search_vector"]
+
+
+def store_messages(messages):
+    """
+    INSERT ... ON CONFLICT (id) DO NOTHING RETURNING id; returns the ids
+    this call inserted.
+
+    bulk_create(ignore_conflicts=True) cannot report which rows conflicted,
+    and checking first races a concurrent insert of the same id. Only the
+    statement that actually inserts a row gets its id back.
+    """
+    if not messages:
+        return set()
+
+    meta = ChatMessage._meta
+    fields = _insert_fields()
+    qn = connection.ops.quote_name
+
+    params = []
+    for m in messages:
+        params += [f.get_db_prep_save(f.pre_save(m, add=True), connection) for f in fields]
+
+    row = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    sql = (
+        f"INSERT INTO {qn(meta.db_table)} ({', '.join(qn(f.column) for f in fields)}) "
+        f"VALUES {', '.join([row] * len(messages))} "
+        f"ON CONFLICT ({qn(meta.pk.column)}) DO NOTHING "
+        f"RETURNING {qn(meta.pk.column)}"
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {str(message_id) for (message_id,) in cursor.fetchall()}
+
+
+def ingest_messages(room_name, messages):
+    """
+    Store unsaved ChatMessage instances of one room exactly once.
+
+    Returns {message_id: STORED | DUPLICATE | PENDING}. An id whose claim
+    was lost is only DUPLICATE once its row exists. If Redis is unavailable
+    the database alone decides.
+    """
+    ids = [str(m.id) for m in messages]
+
+    try:
+        claimed = set(claim_message_ids(room_name, ids))
+    except redis.RedisError as e:
+        logger.warning("Dedup cache unavailable, falling back to DB: %r", e)
+        claimed = set(ids)
+
+    fresh = [m for m in messages if str(m.id) in claimed]
+
+    try:
+        stored = store_messages(fresh)
+    except Exception:
+        try:
+            release_message_ids(room_name, [str(m.id) for m in fresh])
+        except redis.RedisError:
+            pass
+        raise
+
+    # Claimed but not stored means another insert of the id won the conflict
+    confirmed = set(claimed) - stored
+    lost = [mid for mid in ids if mid not in claimed]
+    if lost:
+        confirmed |= {
+            str(message_id)
+            for message_id in ChatMessage.objects
+            .filter(id__in=lost)
+            .values_list("id", flat=True)
+        }
+
+    return {
+        mid: STORED if mid in stored else DUPLICATE if mid in confirmed else PENDING
+        for mid in ids
+    }
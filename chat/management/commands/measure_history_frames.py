@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from chat.compression import compact_history, deflate
+from chat.history import get_room_history, merge_cached_messages
+from chat.models import ChatMessage
+
+
+class Command(BaseCommand):
+    help = "Measure chat_history bytes per connect and deflate CPU cost for each frame format"
+
+    def add_arguments(self, parser):
+        parser.add_argument("rooms", nargs="*", help="Rooms to measure (default: most recently active)")
+        parser.add_argument("--top", type=int, default=10, help="Number of active rooms when none are given")
+        parser.add_argument("--repeat", type=int, default=20, help="Deflate runs averaged per frame")
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+
+        rooms = options["rooms"] or list(
+            ChatMessage.objects
+            .values("room_name")
+            .annotate(latest=Max("timestamp"))
+            .order_by("-latest")
+            .values_list("room_name", flat=True)[:options["top"]]
+        )
+
+        self.stdout.write(
+            f"{'room':<32} {'msgs':>5} {'legacy':>8} {'compact':>8} "
+            f"{'deflated':>9} {'deflate_us':>11}"
+        )
+
+        for room in rooms:
+            messages = merge_cached_messages(room, get_room_history(room))
+
+            # What connect() sent before negotiation existed
+            legacy = json.dumps({"type": "chat_history", "payload": messages}).encode()
+            compact = json.dumps(
+                compact_history(room, messages), separators=(",", ":")
+            ).encode()
+
+            total_seconds = 0.0
+            for _ in range(options["repeat"]):
+                deflated, seconds = deflate(compact)
+                total_seconds += seconds
+
+            self.stdout.write(
+                f"{room:<32} {len(messages):>5} {len(legacy):>8} {len(compact):>8} "
+                f"{len(deflated):>9} {total_seconds / options['repeat'] * 1e6:>11.1f}"
+            )
@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from chat.replay import Replay, cleanup, load_events
+
+
+class Command(BaseCommand):
+    help = "Replay a recorded chat event log through ChatConsumer and report throughput and latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("log", help="File written with CHAT_RECORDER_PATH")
+        parser.add_argument(
+            "--speed", default="1",
+            help="Time multiplier (1 = recorded pace, 10 = ten times faster) or 'max'",
+        )
+        parser.add_argument(
+            "--users", required=True,
+            help="Comma-separated existing user ids that stand in for recorded users",
+        )
+        parser.add_argument("--room-prefix", default="replay_", help="Prefix for stand-in room names")
+        parser.add_argument(
+            "--in-memory-layer", action="store_true",
+            help="Use an in-process channel layer instead of CHANNEL_LAYERS",
+        )
+        parser.add_argument(
+            "--cleanup", action="store_true",
+            help="Delete the messages of the stand-in rooms after the report",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user_ids = [int(u) for u in options["users"].split(",") if u.strip()]
+            speed = None if options["speed"] == "max" else float(options["speed"])
+        except ValueError as e:
+            raise CommandError(e)
+
+        if not user_ids:
+            raise CommandError("--users needs at least one user id")
+        if speed is not None and speed <= 0:
+            raise CommandError("--speed must be positive or 'max'")
+        if options["cleanup"] and not options["room_prefix"]:
+            raise CommandError("--cleanup needs a non-empty --room-prefix")
+
+        events = load_events(options["log"])
+        replay = Replay(events, user_ids, speed=speed, room_prefix=options["room_prefix"])
+
+        layers = None
+        if options["in_memory_layer"]:
+            layers = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+        try:
+            if layers:
+                with override_settings(CHANNEL_LAYERS=layers):
+                    report = asyncio.run(replay.run())
+            else:
+                report = asyncio.run(replay.run())
+        except ValueError as e:
+            raise CommandError(e)
+
+        self.stdout.write(json.dumps(report, indent=2))
+
+        if options["cleanup"]:
+            deleted = cleanup(options["room_prefix"])
+            self.stdout.write(f"Deleted {deleted} replayed message(s)")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from chat.analytics import rollup_activity
+
+
+class Command(BaseCommand):
+    help = "Fold closed Redis activity buckets into RoomActivity (run every few minutes from cron)"
+
+    def handle(self, *args, **options):
+        count = rollup_activity()
+        self.stdout.write(f"Rolled up {count} bucket(s)")
@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from chat.analytics import room_activity
+
+
+class Command(BaseCommand):
+    help = "Report messages/minute, unique and top senders per room from the activity counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--minutes", type=int, default=60, help="Reporting window")
+        parser.add_argument("--room", help="Only this room")
+        parser.add_argument("--top", type=int, default=5, help="Top senders per room")
+        parser.add_argument("--limit", type=int, default=20, help="Rooms to show")
+        parser.add_argument("--json", action="store_true", help="Print the raw report as JSON")
+
+    def handle(self, *args, **options):
+        report = room_activity(
+            minutes=options["minutes"],
+            room_name=options["room"],
+            top=options["top"],
+        )[:options["limit"]]
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"{len(report)} active room(s) in the last {options['minutes']} min\n"
+            f"{'room':<32} {'msgs':>7} {'msg/min':>8} {'senders':>8}  top senders"
+        )
+        for row in report:
+            per_minute = row["messages"] / options["minutes"]
+            top = ", ".join(f"{sender}:{count}" for sender, count in row["top_senders"])
+            self.stdout.write(
+                f"{row['room_name']:<32} {row['messages']:>7} {per_minute:>8.2f} "
+                f"{row['unique_senders']:>8}  {top}"
+            )
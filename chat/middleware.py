@@ -1,13 +1,14 @@
 from urllib.parse import parse_qs
 
 from channels.middleware import BaseMiddleware
-from channels.db import database_sync_to_async
 
 from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 
+from chat.executors import db_executor
 
-@database_sync_to_async
+
+@db_executor("auth")
 def get_user(user_id):
     # 🔥 Import INSIDE function
     from shared.models import User
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.11 on 2026-10-19 13:08
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+SEARCH_TRIGGER_SQL = """
+CREATE TRIGGER chat_chatmessage_search_vector_update
+BEFORE INSERT OR UPDATE OF message ON chat_chatmessage
+FOR EACH ROW EXECUTE FUNCTION
+tsvector_update_trigger(search_vector, 'pg_catalog.english', message);
+
+UPDATE chat_chatmessage
+SET search_vector = to_tsvector('pg_catalog.english', message);
+"""
+
+DROP_SEARCH_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS chat_chatmessage_search_vector_update ON chat_chatmessage;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_chatroom_remove_chatmessage_receiver_and_more'),
+        ('shared', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(SEARCH_TRIGGER_SQL, DROP_SEARCH_TRIGGER_SQL),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='chat_message_search_gin'),
+        ),
+    ]
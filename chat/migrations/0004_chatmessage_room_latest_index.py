@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-19 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_chatmessage_search_vector'),
+        ('shared', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['room_name', '-timestamp'], name='chat_message_room_latest'),
+        ),
+    ]
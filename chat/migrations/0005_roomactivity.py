@@ -0,0 +1,30 @@
+# Generated by Django 5.2.11 on 2026-10-19 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_chatmessage_room_latest_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room_name', models.CharField(max_length=255)),
+                ('bucket_start', models.DateTimeField()),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('unique_senders', models.PositiveIntegerField(default=0)),
+                ('sender_hll', models.BinaryField(null=True)),
+                ('top_senders', models.JSONField(default=list)),
+            ],
+            options={
+                'ordering': ['bucket_start'],
+                'indexes': [models.Index(fields=['bucket_start'], name='chat_room_activity_bucket')],
+                'constraints': [models.UniqueConstraint(fields=('room_name', 'bucket_start'), name='chat_room_activity_bucket_unique')],
+            },
+        ),
+    ]
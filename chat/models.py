@@ -1,4 +1,6 @@
 import uuid
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from shared.models import User
 
@@ -26,9 +28,21 @@ class ChatMessage(models.Model):
     is_seen = models.BooleanField(default=False)
 
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Bumped on insert and by every receipt update (QuerySet.update() skips
+    # auto_now, so those set it explicitly); drives the history ETags
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Filled by a database trigger on INSERT / UPDATE OF message, so
+    # bulk_create and raw inserts keep the index current as well.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ["timestamp"]
+        indexes = [
+            models.Index(fields=["room_name", "-timestamp"], name="chat_message_room_latest"),
+            models.Index(fields=["room_name", "-updated_at"], name="chat_message_room_updated"),
+            GinIndex(fields=["search_vector"], name="chat_message_search_gin"),
+        ]
 
 class ChatRoom(models.Model):
     id = models.UUIDField(primary_key=True)
@@ -40,5 +54,29 @@ class ChatRoom(models.Model):
         db_table = "Worker_chatroom"
 
 
+class RoomActivity(models.Model):
+    """
+    Per-room, per-bucket rollup of the Redis counters kept by chat.analytics.
+    Reporting reads this table, never ChatMessage.
+    """
+
+    room_name = models.CharField(max_length=255)
+    bucket_start = models.DateTimeField()
 
+    message_count = models.PositiveIntegerField(default=0)
+    unique_senders = models.PositiveIntegerField(default=0)
+    # Raw Redis HyperLogLog, so unique senders can be merged across buckets
+    sender_hll = models.BinaryField(null=True)
+    top_senders = models.JSONField(default=list)
 
+    class Meta:
+        ordering = ["bucket_start"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["room_name", "bucket_start"],
+                name="chat_room_activity_bucket_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["bucket_start"], name="chat_room_activity_bucket"),
+        ]
@@ -0,0 +1,147 @@
+"""
+Opt-in traffic recorder for capacity planning.
+
+With CHAT_RECORDER_PATH set, ChatConsumer appends one compact JSON line per
+connect / receive / disconnect:
+
+    {"t": 1760870000.123, "c": "<conn>", "e": "connect", "u": "<user>", "r": "<room>", "sp": [...]}
+    {"t": ..., "c": "<conn>", "e": "receive", "type": "chat_message", "id": "<msg>", "len": 42}
+    {"t": ..., "c": "<conn>", "e": "disconnect", "code": 1000}
+
+Users, rooms, connections and message ids are replaced by keyed hashes and
+message text by its length, so the log carries the traffic shape only.
+chat/replay.py feeds it back through the consumer.
+"""
+import functools
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+ANON_LENGTH = 12
+
+
+def _never_raise(hook):
+    """Recording must never change how the consumer behaves."""
+
+    @functools.wraps(hook)
+    def wrapper(*args, **kwargs):
+        try:
+            hook(*args, **kwargs)
+        except Exception as e:
+            logger.warning("Recorder %s failed: %r", hook.__name__, e)
+
+    return wrapper
+
+
+def _text_length(value):
+    return 0 if value is None else len(value if isinstance(value, str) else str(value))
+
+
+def _item_count(value):
+    return len(value) if isinstance(value, (list, tuple)) else 0
+
+
+class EventRecorder:
+    def __init__(self, path, salt=None):
+        # O_APPEND keeps each single-write line intact across worker processes
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        self.salt = (salt or secrets.token_hex(16)).encode()
+
+    def anon(self, value):
+        if value is None:
+            return None
+        digest = hmac.new(self.salt, str(value).encode(), hashlib.sha256).hexdigest()
+        return digest[:ANON_LENGTH]
+
+    def write(self, consumer, event, **fields):
+        line = json.dumps(
+            {
+                "t": round(time.time(), 4),
+                "c": self.anon(consumer.channel_name),
+                "e": event,
+                **fields,
+            },
+            separators=(",", ":"),
+        )
+        os.write(self.fd, (line + "\n").encode())
+
+    # ------------------------
+    # CONSUMER HOOKS
+    # ------------------------
+
+    @_never_raise
+    def connect(self, consumer):
+        self.write(
+            consumer,
+            "connect",
+            u=self.anon(consumer.user_id),
+            r=self.anon(consumer.room_name),
+            sp=consumer.scope.get("subprotocols") or [],
+        )
+
+    @_never_raise
+    def disconnect(self, consumer, close_code):
+        self.write(consumer, "disconnect", code=close_code)
+
+    @_never_raise
+    def receive(self, consumer, data):
+        event_type = data.get("type")
+        payload = data.get("payload")
+        if not isinstance(payload, dict):
+            payload = {}
+        fields = {"type": event_type}
+
+        if event_type in ("chat_message", "build_bundle"):
+            fields["id"] = self.anon(payload.get("id"))
+            fields["len"] = _text_length(payload.get("message"))
+            if event_type == "build_bundle":
+                fields["builds"] = _item_count(payload.get("build_ids"))
+
+        elif event_type == "typing":
+            fields["is_typing"] = bool(payload.get("is_typing"))
+
+        elif event_type in ("message_delivered", "message_seen"):
+            fields["id"] = self.anon(payload.get("message_id"))
+
+        elif event_type == "search":
+            fields["len"] = _text_length(payload.get("query"))
+
+        self.write(consumer, "receive", **fields)
+
+
+_recorder = None
+_recorder_failed = False
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    """
+    The process recorder, or None when CHAT_RECORDER_PATH is not set or
+    cannot be opened (logged once).
+    """
+    global _recorder, _recorder_failed
+
+    if not settings.CHAT_RECORDER_PATH:
+        return None
+
+    with _recorder_lock:
+        if _recorder is None and not _recorder_failed:
+            try:
+                _recorder = EventRecorder(
+                    settings.CHAT_RECORDER_PATH, settings.CHAT_RECORDER_SALT
+                )
+            except OSError as e:
+                _recorder_failed = True
+                logger.warning(
+                    "Recording disabled, cannot open %s: %r", settings.CHAT_RECORDER_PATH, e
+                )
+        return _recorder
@@ -1,6 +1,7 @@
 import redis
 import json
 import os
+import time
 
 REDIS_HOST = os.environ.get("REDIS_HOST", "host.docker.internal")
 REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
@@ -12,8 +13,20 @@ redis_client = redis.Redis(
     decode_responses=True,
 )
 
+# Same server, undecoded replies (binary values such as HyperLogLogs)
+redis_raw_client = redis.Redis(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=0,
+)
+
 REDIS_CHAT_LIMIT = 20
 
+# room_name -> unix time of its last message, trimmed to the newest
+# ACTIVE_ROOMS_LIMIT rooms on every add
+ACTIVE_ROOMS_KEY = "chat:rooms:active"
+ACTIVE_ROOMS_LIMIT = 1000
+
 
 def get_room_key(room_name):
     return f"chat:room:{room_name}"
@@ -22,11 +35,20 @@ def get_room_key(room_name):
 def add_message_to_redis(room_name, message_data):
     print("🔥 REDIS ADD:", room_name)
     key = get_room_key(room_name)
-    redis_client.lpush(key, json.dumps(message_data))
-    redis_client.ltrim(key, 0, REDIS_CHAT_LIMIT - 1)
+    pipe = redis_client.pipeline()
+    pipe.lpush(key, json.dumps(message_data))
+    pipe.ltrim(key, 0, REDIS_CHAT_LIMIT - 1)
+    pipe.zadd(ACTIVE_ROOMS_KEY, {room_name: time.time()})
+    pipe.zremrangebyrank(ACTIVE_ROOMS_KEY, 0, -(ACTIVE_ROOMS_LIMIT + 1))
+    pipe.execute()
 
 
 def get_messages_from_redis(room_name):
     key = get_room_key(room_name)
     messages = redis_client.lrange(key, 0, -1)
     return [json.loads(msg) for msg in reversed(messages)]
+
+
+def get_hot_rooms(limit):
+    """Most recently active rooms, newest first."""
+    return redis_client.zrevrange(ACTIVE_ROOMS_KEY, 0, limit - 1)
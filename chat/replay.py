@@ -0,0 +1,299 @@
+"""
+Replay a chat/recorder.py log through ChatConsumer.
+
+Every recorded connection becomes a WebsocketCommunicator against the real
+consumer. Stand-ins replace what the log cannot carry: recorded users map
+round-robin onto existing staging user ids, rooms onto synthetic
+`<prefix><hash>` names (membership is trusted), and message ids onto fresh
+UUIDs that stay stable across a recorded retry.
+
+Latency is measured from the client's point of view: connect to
+chat_history, send to message_ack, search to search_results.
+
+Stored messages skip the Redis room cache and the analytics counters, so
+replay rooms never reach chat:rooms:active (warmup) or the activity
+reports. They still become ChatMessage rows; cleanup() deletes them.
+"""
+import asyncio
+import json
+import statistics
+import time
+import uuid
+import zlib
+from collections import Counter, defaultdict, deque
+
+from channels.testing import WebsocketCommunicator
+
+from chat.consumers import ChatConsumer
+from chat.models import ChatMessage
+from shared.models import User
+
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 24 * 3600
+DRAIN_TIMEOUT = 10
+
+
+class ReplayChatConsumer(ChatConsumer):
+    """
+    Stand-in rooms have no Worker_chatroom rows; trust membership. Keep
+    replay traffic out of the shared Redis cache and analytics.
+    """
+
+    async def is_participant(self, user_id):
+        return True
+
+    def cache_message(self, message_data):
+        pass
+
+    def record_activity(self, sender_id):
+        pass
+
+
+def cleanup(room_prefix):
+    """Delete the ChatMessage rows of every `<room_prefix>*` room."""
+    if not room_prefix:
+        raise ValueError("Refusing to clean up without a room prefix")
+    deleted, _ = ChatMessage.objects.filter(room_name__startswith=room_prefix).delete()
+    return deleted
+
+
+def load_events(path):
+    with open(path) as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    # Lines from several workers interleave; replay in recorded time order
+    events.sort(key=lambda e: e["t"])
+    return events
+
+
+def percentiles(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def pick(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+class Connection:
+    def __init__(self, communicator, user_id):
+        self.communicator = communicator
+        self.user_id = user_id
+        self.pending_acks = {}
+        self.pending_searches = deque()
+        self.reader = None
+
+
+class Replay:
+    def __init__(self, events, user_ids, speed=1.0, room_prefix="replay_"):
+        """`speed` is a time multiplier; None replays as fast as possible."""
+        self.events = events
+        self.speed = speed
+        self.room_prefix = room_prefix
+        self.run_id = uuid.uuid4()
+
+        self.user_ids = list(user_ids)
+        self.user_map = {}
+        self.users = {}
+
+        self.connections = {}
+        # Events run in order per connection, concurrently across connections
+        self.tails = {}
+        self.unacked = 0
+        self.latencies = defaultdict(list)
+        self.counts = Counter()
+        self.statuses = Counter()
+
+    # ------------------------
+    # STAND-INS
+    # ------------------------
+
+    def stand_in_user(self, anon_user):
+        if anon_user not in self.user_map:
+            self.user_map[anon_user] = self.user_ids[len(self.user_map) % len(self.user_ids)]
+        return self.users[self.user_map[anon_user]]
+
+    def stand_in_room(self, anon_room):
+        return f"{self.room_prefix}{anon_room}"
+
+    def stand_in_message_id(self, anon_id):
+        # Same recorded id -> same UUID, so recorded retries stay retries
+        return str(uuid.uuid5(self.run_id, anon_id or uuid.uuid4().hex))
+
+    def application(self, user, room_name):
+        consumer = ReplayChatConsumer.as_asgi()
+
+        async def app(scope, receive, send):
+            scope = dict(
+                scope,
+                user=user,
+                url_route={"args": (), "kwargs": {"room_name": room_name}},
+            )
+            return await consumer(scope, receive, send)
+
+        return app
+
+    # ------------------------
+    # DRIVER
+    # ------------------------
+
+    async def run(self):
+        self.users = {
+            user.id: user
+            async for user in User.objects.filter(id__in=self.user_ids)
+        }
+        missing = set(self.user_ids) - set(self.users)
+        if missing:
+            raise ValueError(f"Stand-in users not found: {sorted(missing)}")
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first_t = self.events[0]["t"] if self.events else 0
+
+        for event in self.events:
+            if self.speed:
+                delay = started + (event["t"] - first_t) / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            previous = self.tails.get(event["c"])
+            self.tails[event["c"]] = asyncio.ensure_future(self.chain(previous, event))
+
+        await asyncio.gather(*self.tails.values())
+
+        for conn_id in list(self.connections):
+            await self.close(conn_id, 1000)
+
+        return self.report(loop.time() - started)
+
+    async def chain(self, previous, event):
+        if previous is not None:
+            await previous
+        try:
+            await self.dispatch(event)
+        except Exception as e:
+            self.counts["errors"] += 1
+            print("❌ Replay error:", event.get("e"), e)
+
+    async def dispatch(self, event):
+        kind = event["e"]
+        conn_id = event["c"]
+
+        if kind == "connect":
+            await self.open(conn_id, event)
+        elif conn_id not in self.connections:
+            # Recording started mid-connection
+            self.counts["skipped"] += 1
+        elif kind == "receive":
+            await self.send(self.connections[conn_id], event)
+        elif kind == "disconnect":
+            await self.close(conn_id, event.get("code") or 1000)
+
+    async def open(self, conn_id, event):
+        user = self.stand_in_user(event["u"])
+        communicator = WebsocketCommunicator(
+            self.application(user, self.stand_in_room(event["r"])),
+            f"/ws/chat/{self.stand_in_room(event['r'])}/",
+            subprotocols=event.get("sp") or [],
+        )
+
+        sent = time.perf_counter()
+        accepted, _ = await communicator.connect(timeout=CONNECT_TIMEOUT)
+        self.counts["connect"] += 1
+        if not accepted:
+            self.counts["rejected"] += 1
+            return
+
+        conn = Connection(communicator, user.id)
+        history = self.decode(await communicator.receive_from(timeout=CONNECT_TIMEOUT))
+        if history.get("type") == "chat_history":
+            self.latencies["connect"].append(time.perf_counter() - sent)
+
+        conn.reader = asyncio.ensure_future(self.read(conn))
+        self.connections[conn_id] = conn
+
+    async def close(self, conn_id, code):
+        conn = self.connections.pop(conn_id)
+        # The server still answers frames received before the close
+        await self.drain(conn)
+        self.unacked += len(conn.pending_acks)
+
+        conn.reader.cancel()
+        await conn.communicator.disconnect(code=code)
+        self.counts["disconnect"] += 1
+
+    async def send(self, conn, event):
+        event_type = event.get("type")
+        payload = {}
+
+        if event_type in ("chat_message", "build_bundle"):
+            message_id = self.stand_in_message_id(event.get("id"))
+            payload = {"id": message_id, "message": "x" * max(1, event.get("len", 1))}
+            if event_type == "build_bundle":
+                payload["build_ids"] = list(range(1, max(1, event.get("builds", 1)) + 1))
+            conn.pending_acks[message_id] = time.perf_counter()
+
+        elif event_type == "typing":
+            payload = {"is_typing": event.get("is_typing", True)}
+
+        elif event_type in ("message_delivered", "message_seen"):
+            payload = {"message_id": self.stand_in_message_id(event.get("id"))}
+
+        elif event_type == "search":
+            payload = {"query": "x" * max(1, event.get("len", 1))}
+            conn.pending_searches.append(time.perf_counter())
+
+        await conn.communicator.send_json_to({"type": event_type, "payload": payload})
+        self.counts[event_type] += 1
+
+    async def read(self, conn):
+        while True:
+            frame = self.decode(await conn.communicator.receive_from(timeout=READ_TIMEOUT))
+            received = time.perf_counter()
+            frame_type = frame.get("type")
+
+            if frame_type == "message_ack":
+                ack = frame["payload"]
+                self.statuses[ack["status"]] += 1
+                sent = conn.pending_acks.pop(ack["id"], None)
+                if sent is not None:
+                    self.latencies["ack"].append(received - sent)
+
+            elif frame_type == "search_results" and conn.pending_searches:
+                self.latencies["search"].append(received - conn.pending_searches.popleft())
+
+    async def drain(self, conn):
+        """Wait for the connection's outstanding replies, up to DRAIN_TIMEOUT."""
+        deadline = time.perf_counter() + DRAIN_TIMEOUT
+        while (conn.pending_acks or conn.pending_searches) and not conn.reader.done():
+            if time.perf_counter() > deadline:
+                break
+            await asyncio.sleep(0.01)
+
+    @staticmethod
+    def decode(frame):
+        if isinstance(frame, bytes):
+            frame = zlib.decompress(frame)
+        return json.loads(frame)
+
+    def report(self, elapsed):
+        sent = sum(
+            self.counts[k] for k in self.counts
+            if k not in ("skipped", "rejected", "disconnect", "errors")
+        )
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "events": len(self.events),
+            "events_per_second": round(sent / elapsed, 2) if elapsed else None,
+            "counts": dict(self.counts),
+            "ack_statuses": dict(self.statuses),
+            "unacked": self.unacked,
+            "latency": {name: percentiles(s) for name, s in self.latencies.items()},
+        }
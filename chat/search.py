@@ -0,0 +1,103 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+from chat.models import ChatMessage, ChatRoom
+
+# Must match the config used by the search_vector trigger (migration 0003)
+SEARCH_CONFIG = "english"
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
+
+
+def encode_cursor(rank, timestamp, message_id):
+    raw = json.dumps([rank, timestamp.isoformat(), str(message_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        rank, timestamp, message_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode())
+        )
+        return float(rank), datetime.fromisoformat(timestamp), uuid.UUID(str(message_id))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid search cursor")
+
+
+def search_messages(user_id, query, cursor=None, limit=SEARCH_PAGE_SIZE, room_name=None):
+    """
+    Ranked full-text search over the rooms `user_id` participates in.
+
+    Results are ordered by (rank, timestamp, id) descending and paginated
+    with an opaque keyset cursor, so deep pages cost the same as the first.
+    Raises ValueError for a malformed cursor or limit.
+    """
+    query = (query or "").strip()
+    if not query:
+        return {"results": [], "next_cursor": None}
+
+    if limit in (None, "", 0):
+        limit = SEARCH_PAGE_SIZE
+    try:
+        limit = max(1, min(int(limit), SEARCH_MAX_PAGE_SIZE))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid search limit")
+
+    rooms = ChatRoom.objects.filter(participants__id=user_id)
+    if room_name:
+        rooms = rooms.filter(room_name=room_name)
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+
+    qs = (
+        ChatMessage.objects
+        .filter(
+            room_name__in=rooms.values("room_name"),
+            search_vector=search_query,
+        )
+        # ts_rank returns real; widen it so the cursor round-trips exactly
+        .annotate(rank=Cast(SearchRank(F("search_vector"), search_query), FloatField()))
+        .select_related("sender")
+    )
+
+    if cursor:
+        rank, timestamp, message_id = decode_cursor(cursor)
+        qs = qs.filter(
+            Q(rank__lt=rank)
+            | Q(rank=rank, timestamp__lt=timestamp)
+            | Q(rank=rank, timestamp=timestamp, id__lt=message_id)
+        )
+
+    page = list(qs.order_by("-rank", "-timestamp", "-id")[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = page[-1]
+        next_cursor = encode_cursor(last.rank, last.timestamp, last.id)
+
+    return {
+        "results": [
+            {
+                "id": str(m.id),
+                "room_name": m.room_name,
+                "sender_id": m.sender_id,
+                "sender_name": m.sender.email,
+                "message": m.message,
+                "message_type": m.message_type,
+                "build_ids": m.build_ids,
+                "timestamp": m.timestamp.isoformat(),
+                "rank": m.rank,
+            }
+            for m in page
+        ],
+        "next_cursor": next_cursor,
+    }
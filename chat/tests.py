@@ -0,0 +1,367 @@
+import asyncio
+import base64
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from unittest import skipUnless
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import redis
+from asgiref.sync import async_to_sync
+from django.db import connections
+from django.test import SimpleTestCase
+
+from chat.analytics import (
+    BUCKET_SECONDS,
+    BUCKETS_KEY,
+    _messages_key,
+    _senders_key,
+    _to_datetime,
+    _top_key,
+    rollup_activity,
+)
+from chat.consumers import ChatConsumer
+from chat.history import get_room_validators
+from chat.ingest import DUPLICATE, PENDING, STORED, _insert_fields, store_messages
+from chat.models import ChatMessage
+from chat.recorder import EventRecorder
+from chat.replay import ReplayChatConsumer
+from chat.search import decode_cursor, encode_cursor, search_messages
+from shared.models import User
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+def make_cursor(*parts):
+    return base64.urlsafe_b64encode(json.dumps(list(parts)).encode()).decode()
+
+
+class SearchCursorTests(SimpleTestCase):
+
+    def test_cursor_round_trip(self):
+        timestamp = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        message_id = uuid.uuid4()
+
+        cursor = encode_cursor(0.25, timestamp, message_id)
+
+        self.assertEqual(decode_cursor(cursor), (0.25, timestamp, message_id))
+
+    def test_tampered_message_id_is_rejected(self):
+        cursor = make_cursor(0.1, "2026-01-01T00:00:00+00:00", "nope")
+
+        with self.assertRaises(ValueError):
+            decode_cursor(cursor)
+
+        # Rejected before any query is built, so callers answer 400 / error
+        with self.assertRaises(ValueError):
+            search_messages(1, "hello", cursor=cursor)
+
+    def test_garbage_cursor_is_rejected(self):
+        with self.assertRaises(ValueError):
+            decode_cursor("not-base64-json")
+
+    def test_non_numeric_limit_is_rejected(self):
+        for limit in ({}, [], [5], {"n": 5}, "ten"):
+            with self.assertRaises(ValueError):
+                search_messages(1, "hello", limit=limit)
+
+
+class RoomValidatorTests(SimpleTestCase):
+
+    def validators(self, updated_at, before=None):
+        latest = (uuid.UUID(int=1), updated_at)
+        objects = Mock()
+        objects.filter.return_value.order_by.return_value.values_list.return_value \
+            .first.return_value = latest
+        with patch("chat.history.ChatMessage.objects", objects):
+            return get_room_validators("room1", before)
+
+    def test_receipt_update_changes_etag(self):
+        # Same newest message; an older one was marked seen
+        before_seen = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        after_seen = datetime(2026, 1, 1, 0, 5, tzinfo=timezone.utc)
+
+        self.assertNotEqual(self.validators(before_seen)[0], self.validators(after_seen)[0])
+        self.assertEqual(self.validators(after_seen)[1], after_seen)
+
+    def test_each_page_has_its_own_etag(self):
+        updated_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+        self.assertNotEqual(
+            self.validators(updated_at)[0],
+            self.validators(updated_at, before=updated_at)[0],
+        )
+
+
+class FakeMessageTable:
+    """
+    Stands in for ChatMessage.objects and the INSERT ... RETURNING cursor;
+    like Postgres, ids come back as UUIDs.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.returned = []
+
+    def filter(self, id__in):
+        wanted = {str(message_id) for message_id in id__in}
+        return Mock(values_list=Mock(
+            return_value=[pk for pk in self.rows if str(pk) in wanted]
+        ))
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        # The id is the first column of every VALUES row
+        self.returned = []
+        for message_id in params[::len(_insert_fields())]:
+            if message_id not in self.rows:
+                self.rows[message_id] = object()
+                self.returned.append((message_id,))
+
+    def fetchall(self):
+        return self.returned
+
+
+class IngestTests(SimpleTestCase):
+
+    def setUp(self):
+        self.table = FakeMessageTable()
+        self.patch("chat.ingest.ChatMessage.objects", self.table)
+        # Real value adaptation and quoting, fake cursor; pool threads share it
+        backend = connections["default"]
+        self.patch("chat.ingest.connection", Mock(
+            ops=backend.ops, features=backend.features, cursor=self.table.cursor
+        ))
+
+        self.add_to_redis = self.patch("chat.consumers.add_message_to_redis")
+
+    def patch(self, target, *args, **kwargs):
+        patcher = patch(target, *args, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def make_consumer(self, consumer_class=ChatConsumer):
+        consumer = consumer_class()
+        consumer.user_id = 1
+        consumer.room_name = "room1"
+        consumer.room_group_name = "chat_room1"
+        consumer.channel_layer = Mock(group_send=AsyncMock())
+        consumer.send_event = AsyncMock()
+        consumer.get_user = AsyncMock(return_value=User(id=1, email="a@example.com"))
+        consumer.record_activity = Mock()
+        return consumer
+
+    def send_chat_message(self, consumer, message_id):
+        async_to_sync(consumer.handle_chat_message)({
+            "type": "chat_message",
+            "payload": {"id": message_id, "message": "hello"},
+        })
+
+    def acks(self, consumer):
+        return [
+            call.args[0]["payload"]["status"]
+            for call in consumer.send_event.await_args_list
+            if call.args[0]["type"] == "message_ack"
+        ]
+
+    def test_store_messages_skips_existing_row(self):
+        message_id = str(uuid.uuid4())
+        self.table.rows[uuid.UUID(message_id)] = object()
+
+        stored = store_messages([ChatMessage(id=message_id, room_name="room1", message="hi")])
+
+        self.assertEqual(stored, set())
+
+    def test_retry_without_redis_claim_is_duplicate_and_not_rebroadcast(self):
+        # Redis down, or the retry outlived the dedup window: the DB decides
+        self.patch("chat.ingest.claim_message_ids", side_effect=redis.RedisError)
+        consumer = self.make_consumer()
+        message_id = str(uuid.uuid4())
+
+        self.send_chat_message(consumer, message_id)
+        self.send_chat_message(consumer, message_id)
+
+        self.assertEqual(self.acks(consumer), [STORED, DUPLICATE])
+        self.assertEqual(consumer.channel_layer.group_send.await_count, 1)
+        self.assertEqual(self.add_to_redis.call_count, 1)
+
+    def test_concurrent_sends_without_redis_store_once(self):
+        self.patch("chat.ingest.claim_message_ids", side_effect=redis.RedisError)
+        consumer = self.make_consumer()
+        message = {"type": "chat_message", "payload": {"id": str(uuid.uuid4()), "message": "hi"}}
+
+        async def send_twice():
+            await asyncio.gather(
+                consumer.handle_chat_message(message),
+                consumer.handle_chat_message(message),
+            )
+
+        async_to_sync(send_twice)()
+
+        # Only the INSERT that returned the id counts as stored
+        self.assertEqual(sorted(self.acks(consumer)), [DUPLICATE, STORED])
+        self.assertEqual(consumer.channel_layer.group_send.await_count, 1)
+        self.assertEqual(len(self.table.rows), 1)
+
+    def test_replay_consumer_stays_out_of_shared_redis(self):
+        self.patch("chat.ingest.claim_message_ids", side_effect=lambda room, ids: ids)
+        record_message = self.patch("chat.consumers.record_message")
+        consumer = self.make_consumer(ReplayChatConsumer)
+        del consumer.record_activity
+
+        self.send_chat_message(consumer, str(uuid.uuid4()))
+
+        self.assertEqual(self.acks(consumer), [STORED])
+        self.add_to_redis.assert_not_called()
+        record_message.assert_not_called()
+
+    def test_lost_claim_before_original_is_stored_is_pending(self):
+        # The first attempt still holds the claim; its insert has not landed
+        self.patch("chat.ingest.claim_message_ids", return_value=[])
+        consumer = self.make_consumer()
+
+        self.send_chat_message(consumer, str(uuid.uuid4()))
+
+        self.assertEqual(self.acks(consumer), [PENDING])
+        consumer.channel_layer.group_send.assert_not_awaited()
+        self.assertEqual(self.table.rows, {})
+
+    def test_lost_claim_after_original_is_stored_is_duplicate(self):
+        self.patch("chat.ingest.claim_message_ids", return_value=[])
+        consumer = self.make_consumer()
+        message_id = str(uuid.uuid4())
+        self.table.rows[uuid.UUID(message_id)] = object()
+
+        self.send_chat_message(consumer, message_id)
+
+        self.assertEqual(self.acks(consumer), [DUPLICATE])
+        consumer.channel_layer.group_send.assert_not_awaited()
+
+
+class FakeActivityTable:
+    """Stands in for RoomActivity.objects, keyed like its unique constraint."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def select_for_update(self):
+        return self
+
+    def filter(self, bucket_start, room_name__in):
+        return [
+            row for (room_name, start), row in self.rows.items()
+            if start == bucket_start and room_name in room_name__in
+        ]
+
+    def bulk_create(self, objs, **kwargs):
+        for obj in objs:
+            self.rows[(obj.room_name, obj.bucket_start)] = obj
+
+
+def fake_merge_hlls(*blobs):
+    # Stand-in "HLLs" are comma-separated sender ids
+    senders = set()
+    for blob in blobs:
+        if blob:
+            senders |= set(bytes(blob).split(b","))
+    return len(senders), b",".join(sorted(senders)) or None
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class RollupTests(SimpleTestCase):
+
+    bucket = 1_800_000_000
+
+    def setUp(self):
+        server = fakeredis.FakeServer()
+        self.redis = fakeredis.FakeRedis(server=server, decode_responses=True)
+        self.table = FakeActivityTable()
+
+        for target, value in [
+            ("chat.analytics.redis_client", self.redis),
+            ("chat.analytics.redis_raw_client", fakeredis.FakeRedis(server=server)),
+            ("chat.analytics.RoomActivity.objects", self.table),
+            ("chat.analytics.transaction", MagicMock()),
+            ("chat.analytics._merge_hlls", fake_merge_hlls),
+        ]:
+            patcher = patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def record(self, sender_id, room_name="room1"):
+        # record_message's writes, with a string standing in for the HLL
+        senders_key = _senders_key(self.bucket, room_name)
+        senders = set(filter(None, (self.redis.get(senders_key) or "").split(",")))
+        self.redis.set(senders_key, ",".join(sorted(senders | {str(sender_id)})))
+        self.redis.hincrby(_messages_key(self.bucket), room_name, 1)
+        self.redis.zincrby(_top_key(self.bucket, room_name), 1, sender_id)
+        self.redis.zadd(BUCKETS_KEY, {self.bucket: self.bucket})
+
+    def rollup(self, buckets_later):
+        return rollup_activity(now=self.bucket + buckets_later * BUCKET_SECONDS)
+
+    def test_late_write_is_merged_into_rolled_up_bucket(self):
+        for sender_id in (1, 1, 2):
+            self.record(sender_id)
+
+        # The next minute is still grace for in-flight writes
+        self.assertEqual(self.rollup(1), 0)
+        self.assertEqual(self.rollup(2), 1)
+
+        # A worker with a slow clock writes into the rolled-up bucket
+        self.record(3)
+        self.assertEqual(self.rollup(3), 1)
+
+        row = self.table.rows[("room1", _to_datetime(self.bucket))]
+        self.assertEqual(row.message_count, 4)
+        self.assertEqual(row.unique_senders, 3)
+        self.assertEqual(row.top_senders, [[1, 2], [2, 1], [3, 1]])
+        self.assertEqual(self.redis.keys("chat:stats:*"), [])
+
+
+class RecorderTests(SimpleTestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        self.recorder = EventRecorder(self.path, "salt")
+        self.addCleanup(os.close, self.recorder.fd)
+        self.consumer = Mock(channel_name="specific.abc")
+
+    def lines(self):
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_odd_payloads_are_recorded_without_raising(self):
+        for data in [
+            {"type": "chat_message", "payload": {"id": "x", "message": 5}},
+            {"type": "build_bundle", "payload": {"build_ids": 7}},
+            {"type": "chat_message", "payload": "nope"},
+        ]:
+            self.recorder.receive(self.consumer, data)
+
+        self.assertEqual(
+            [(line["type"], line["len"]) for line in self.lines()],
+            [("chat_message", 1), ("build_bundle", 0), ("chat_message", 0)],
+        )
+        self.assertEqual(self.lines()[1]["builds"], 0)
+
+    def test_write_errors_are_logged_not_raised(self):
+        with patch("chat.recorder.os.write", side_effect=OSError(28, "No space left on device")):
+            with self.assertLogs("chat.recorder", "WARNING"):
+                self.recorder.receive(self.consumer, {"type": "typing", "payload": {}})
+                self.recorder.disconnect(self.consumer, 1000)
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from chat import views
+
+urlpatterns = [
+    path("search/", views.MessageSearchView.as_view(), name="chat-search"),
+    path("rooms/", views.RoomSummaryListView.as_view(), name="chat-room-list"),
+    path(
+        "rooms/<str:room_name>/messages/",
+        views.RoomHistoryView.as_view(),
+        name="chat-room-history",
+    ),
+]
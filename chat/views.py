@@ -1,3 +1,133 @@
-from django.shortcuts import render
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from chat.history import (
+    HISTORY_LIMIT,
+    get_latest_messages,
+    get_room_history,
+    get_room_summaries,
+    get_room_validators,
+    get_summaries_validators,
+    is_room_participant,
+    merge_cached_messages,
+)
+from chat.compression import frame_stats
+from chat.executors import executor_stats
+from chat.search import search_messages
+from chat.warmup import state as warmup_state
+
+
+def conditional(request, etag, last_modified, build_response):
+    """
+    Answer 304 when the client's validators still match, otherwise build
+    the body. `build_response` is only called on a miss.
+    """
+    last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified_ts
+    )
+    if response is None:
+        response = build_response()
+
+    response["ETag"] = etag
+    if last_modified_ts is not None:
+        response["Last-Modified"] = http_date(last_modified_ts)
+    # Always revalidate; repeat reads are cheap 304s
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def readiness(request):
+    """503 until warmup has finished on this worker."""
+    return JsonResponse(
+        {
+            **warmup_state.as_dict(),
+            "executors": executor_stats(),
+            "frames": frame_stats.as_dict(),
+        },
+        status=200 if warmup_state.ready else 503,
+    )
+
+
+class MessageSearchView(APIView):
+    """
+    GET /api/chat/search/?q=<text>[&room_name=][&cursor=][&limit=]
+
+    Served over HTTP so search load stays off the WebSocket fan-out path.
+    """
+
+    def get(self, request):
+        params = request.query_params
+
+        try:
+            limit = int(params.get("limit", 0)) or None
+            result = search_messages(
+                request.user.id,
+                params.get("q", ""),
+                cursor=params.get("cursor"),
+                limit=limit,
+                room_name=params.get("room_name"),
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result)
+
+
+class RoomSummaryListView(APIView):
+    """
+    GET /api/chat/rooms/
+
+    Latest message and unread count for every room of the user.
+    """
+
+    def get(self, request):
+        latest = get_latest_messages(request.user.id)
+        etag, last_modified = get_summaries_validators(request.user.id, latest)
+
+        return conditional(
+            request, etag, last_modified,
+            lambda: Response(get_room_summaries(request.user.id, latest)),
+        )
+
+
+class RoomHistoryView(APIView):
+    """
+    GET /api/chat/rooms/<room_name>/messages/[?before=<iso timestamp>]
+
+    Same history the socket sends on connect (DB page merged with the
+    Redis cache), with ETag / Last-Modified from the room's last update.
+    """
+
+    def get(self, request, room_name):
+        if not is_room_participant(room_name, request.user.id):
+            raise Http404
+
+        before = request.query_params.get("before")
+        if before is not None:
+            before = parse_datetime(before)
+            if before is None:
+                return Response(
+                    {"detail": "Invalid 'before' timestamp"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        etag, last_modified = get_room_validators(room_name, before)
+
+        def build_response():
+            messages = get_room_history(room_name, HISTORY_LIMIT, before)
+            if before is None:
+                messages = merge_cached_messages(room_name, messages)
+
+            return Response({
+                "room_name": room_name,
+                "payload": messages,
+            })
+
+        return conditional(request, etag, last_modified, build_response)
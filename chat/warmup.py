@@ -0,0 +1,178 @@
+"""
+Worker warmup.
+
+Runs once per process before the worker reports ready on /readyz:
+pre-imports the modules the first connection would otherwise import lazily,
+opens and validates the Postgres, Redis and channel layer connections, and
+primes the membership cache for the hottest rooms.
+"""
+import asyncio
+import importlib
+import logging
+import sys
+import time
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import connection
+
+from chat.executors import db_executor, prewarm
+
+logger = logging.getLogger(__name__)
+
+HOT_MODULES = [
+    "django.contrib.auth.models",
+    "shared.models",
+    "chat.models",
+    "chat.history",
+    "chat.search",
+    "chat.compression",
+    "chat.executors",
+    "chat.consumers",
+    "rest_framework_simplejwt.tokens",
+]
+
+WARMUP_RETRY_SECONDS = 5
+
+
+class WarmupState:
+    def __init__(self):
+        self.ready = False
+        self.started_at = time.monotonic()
+        self.steps = {}
+        self.error = None
+        self.connections = 0
+        self.first_message_seconds = None
+        self.connect_seconds_total = 0.0
+
+    def record_first_message(self, seconds):
+        """Time from connect() to the chat_history frame of one connection."""
+        self.connections += 1
+        self.connect_seconds_total += seconds
+        if self.first_message_seconds is None:
+            self.first_message_seconds = seconds
+
+    def as_dict(self):
+        return {
+            "ready": self.ready,
+            "uptime_seconds": round(time.monotonic() - self.started_at, 3),
+            "warmup_steps": {k: round(v, 6) for k, v in self.steps.items()},
+            "error": self.error,
+            "connections": self.connections,
+            "first_message_seconds": self.first_message_seconds,
+            "avg_first_message_seconds": (
+                self.connect_seconds_total / self.connections if self.connections else None
+            ),
+        }
+
+
+state = WarmupState()
+
+_warmup_task = None
+
+
+# ------------------------
+# STEPS
+# ------------------------
+
+def warm_imports():
+    for name in HOT_MODULES:
+        importlib.import_module(name)
+
+
+def warm_database():
+    # Runs on the DB pool threads; CONN_MAX_AGE keeps the connection open
+    connection.ensure_connection()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+def warm_redis():
+    from chat.redis import redis_client
+
+    redis_client.ping()
+
+
+def warm_caches():
+    from chat.history import prime_room_membership
+    from chat.redis import get_hot_rooms
+
+    # Connect reads history from the DB (merged with the Redis list that
+    # add_message_to_redis already fills), so only membership is primed
+    rooms = get_hot_rooms(settings.CHAT_WARMUP_HOT_ROOMS)
+    for room_name in rooms:
+        prime_room_membership(room_name)
+    return len(rooms)
+
+
+async def warm_channel_layer():
+    layer = get_channel_layer()
+    # Any round trip opens the pool for this event loop
+    await layer.group_discard("warmup", "warmup.ping")
+
+
+async def _timed(name, coro):
+    started = time.perf_counter()
+    await coro
+    state.steps[name] = time.perf_counter() - started
+
+
+async def warmup():
+    """Run every step, retrying until all succeed, then mark the worker ready."""
+    if not settings.CHAT_WARMUP:
+        state.ready = True
+        return
+
+    while not state.ready:
+        try:
+            await _timed("imports", sync_to_async(warm_imports, thread_sensitive=False)())
+            await _timed("database", prewarm(warm_database))
+            await _timed("redis", sync_to_async(warm_redis, thread_sensitive=False)())
+            await _timed("channel_layer", warm_channel_layer())
+            await _timed("caches", db_executor("bulk")(warm_caches)())
+        except Exception as e:
+            state.error = repr(e)
+            logger.warning("Warmup failed, retrying in %ss: %r", WARMUP_RETRY_SECONDS, e)
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+        else:
+            state.error = None
+            state.ready = True
+            logger.info("Worker ready: %s", state.as_dict()["warmup_steps"])
+
+
+# ------------------------
+# SERVER HOOKS
+# ------------------------
+
+class LifespanApp:
+    """ASGI lifespan handler for servers that support it (uvicorn, hypercorn)."""
+
+    async def __call__(self, scope, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Serve /readyz (503) while warming instead of blocking startup
+                global _warmup_task
+                _warmup_task = asyncio.ensure_future(warmup())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def schedule_warmup():
+    """
+    Daphne has no lifespan support; start warmup as soon as its reactor
+    (and the asyncio loop behind it) is running.
+    """
+    if "twisted.internet.reactor" not in sys.modules:
+        return
+
+    from twisted.internet import reactor
+
+    def start():
+        global _warmup_task
+        _warmup_task = asyncio.ensure_future(warmup())
+
+    reactor.callWhenRunning(start)
@@ -11,9 +11,11 @@ django_asgi_app = get_asgi_application()
 
 # 🔥 Import routing AFTER Django setup
 from chat.middleware import JWTAuthMiddleware
+from chat.warmup import LifespanApp, schedule_warmup
 import chat.routing
 
 application = ProtocolTypeRouter({
+    "lifespan": LifespanApp(),
     "http": django_asgi_app,
     "websocket": JWTAuthMiddleware(
         URLRouter(
@@ -21,3 +23,6 @@ application = ProtocolTypeRouter({
         )
     ),
 })
+
+# 🔥 Warm connections and caches before /readyz reports ready
+schedule_warmup()
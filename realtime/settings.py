@@ -48,6 +48,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     "rest_framework",
 
     # channels
@@ -58,6 +59,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'django.middleware.gzip.GZipMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -105,7 +107,38 @@ CHANNEL_LAYERS = {
     },
 }
 
+# WebSocket frames above this many bytes are deflated for clients that
+# negotiated the "chat.v2.deflate" subprotocol (see chat/compression.py)
+CHAT_COMPRESSION_THRESHOLD = int(os.getenv("CHAT_COMPRESSION_THRESHOLD", 1024))
+CHAT_COMPRESSION_LEVEL = int(os.getenv("CHAT_COMPRESSION_LEVEL", 6))
+
+# Thread pools for ORM calls from consumers (chat/executors.py). Each pool
+# thread holds its own persistent connection, so the sum of these is the
+# Postgres connection count per worker; size it against the DB pool.
+CHAT_DB_EXECUTORS = {
+    "auth": int(os.getenv("CHAT_DB_AUTH_THREADS", 4)),    # token user, membership
+    "write": int(os.getenv("CHAT_DB_WRITE_THREADS", 4)),  # message inserts, receipts
+    "read": int(os.getenv("CHAT_DB_READ_THREADS", 4)),    # history on connect
+    "bulk": int(os.getenv("CHAT_DB_BULK_THREADS", 2)),    # mark-all-seen, search, warmup
+}
+
+# Pre-open connections and prime caches before the worker reports ready.
+# Set CHAT_WARMUP=False to measure cold time-to-first-message.
+CHAT_WARMUP = os.getenv("CHAT_WARMUP", "True") == "True"
+CHAT_WARMUP_HOT_ROOMS = int(os.getenv("CHAT_WARMUP_HOT_ROOMS", 50))
+
+# Opt-in traffic recording for chat/replay.py (see chat/recorder.py). Share
+# CHAT_RECORDER_SALT between workers so their anonymized ids line up.
+CHAT_RECORDER_PATH = os.getenv("CHAT_RECORDER_PATH")
+CHAT_RECORDER_SALT = os.getenv("CHAT_RECORDER_SALT")
+
 REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "chat.authentication.JWTAuthentication",
+    ],
+    "DEFAULT_PERMISSION_CLASSES": [
+        "rest_framework.permissions.IsAuthenticated",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
 }
@@ -122,6 +155,10 @@ DATABASES = {
         "PASSWORD":os.getenv('DB_PASSWORD'),    
         "HOST": os.getenv('DB_HOST'),
         "PORT": int(os.getenv('DB_PORT', 5432)),
+        # Keep connections open across consumer DB calls instead of
+        # reconnecting for every query
+        "CONN_MAX_AGE": int(os.getenv('DB_CONN_MAX_AGE', 300)),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
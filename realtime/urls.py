@@ -15,8 +15,12 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
+
+from chat.views import readiness
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/chat/', include('chat.urls')),
+    path('readyz/', readiness, name='readyz'),
 ]
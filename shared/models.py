@@ -11,5 +11,10 @@ class User(models.Model):
         managed = False
         db_table = "Authentication_user"
 
+    @property
+    def is_authenticated(self):
+        # Lets DRF permission classes treat a resolved User as logged in
+        return True
+
     def __str__(self):
         return self.email